@@ -1,6 +1,200 @@
+import functools
 import json
 import re
-from datetime import datetime, timedelta
+from datetime import datetime
+from keyword_matcher import KeywordMatcher
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator
+    orjson = None
+
+
+def _dumps(obj):
+    """Serializes `obj` to an indented JSON string, using orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+# Keyword categories for guardrails, intent detection and slot filling (one bit each)
+(APPROVE, REQUEST_NOUN, MODIFY, SALARY_NOUN, VIEW, OTHERS, STRATEGIC, SCHEDULING_EXEMPT,
+ LEAVE, TICKET, MEETING, ALLOWANCE, ESCALATE,
+ SICK, CASUAL, EMERGENCY, FAMILY, PAYROLL, BENEFIT, RECRUIT, IT_DEPT,
+ INTERNET, EDUCATION, TICKET_URGENT, ESCALATION_URGENT) = (1 << i for i in range(25))
+
+# Built once at import time; `execute` scans each query a single time against all of them.
+_KEYWORDS = KeywordMatcher({
+    APPROVE: frozenset({"approve", "reject", "authorize"}),
+    REQUEST_NOUN: frozenset({"request", "application", "leave", "expense"}),
+    MODIFY: frozenset({"modify", "change", "increase", "decrease", "update"}),
+    SALARY_NOUN: frozenset({"salary", "contract", "pay", "compensation", "ctc"}),
+    VIEW: frozenset({"view"}),
+    OTHERS: frozenset({"other", "colleague", "employee", "manager", "peer"}),
+    STRATEGIC: frozenset({"fire", "terminate", "hire", "recruit"}),
+    SCHEDULING_EXEMPT: frozenset({"meeting", "schedule"}),
+    LEAVE: frozenset({"leave", "time off", "vacation", "sick day"}),
+    TICKET: frozenset({"ticket", "issue", "it support", "bug", "software", "laptop", "access", "payroll issue"}),
+    MEETING: frozenset({"meeting", "schedule", "calendar", "meet with", "appointment"}),
+    ALLOWANCE: frozenset({"allowance", "reimburse", "claim", "expense", "bill", "stipend"}),
+    ESCALATE: frozenset({"escalate", "human", "talk to", "person", "representative", "complaint", "frustrated"}),
+    # Slot keywords read by the handlers
+    SICK: frozenset({"sick"}),
+    CASUAL: frozenset({"casual"}),
+    EMERGENCY: frozenset({"emergency"}),
+    FAMILY: frozenset({"family"}),
+    PAYROLL: frozenset({"payroll"}),
+    BENEFIT: frozenset({"benefit"}),
+    RECRUIT: frozenset({"recruit"}),
+    IT_DEPT: frozenset({"it"}),
+    INTERNET: frozenset({"internet"}),
+    EDUCATION: frozenset({"education"}),
+    TICKET_URGENT: frozenset({"urgent", "critical", "blocking", "immediately"}),
+    ESCALATION_URGENT: frozenset({"urgent", "anger", "frustrated", "immediately"}),
+})
+
+# Precompiled patterns for date, time and slot extraction
+_WEEKDAYS = r'(monday|tuesday|wednesday|thursday|friday|saturday|sunday)'
+_RE_NEXT_WD = re.compile(r'next\s+' + _WEEKDAYS)
+_RE_THIS_WD = re.compile(r'this\s+' + _WEEKDAYS)
+_RE_BARE_WD = re.compile(r'\b' + _WEEKDAYS + r'\b')
+_RE_DURATION = re.compile(r'(\d+)\s*(day|days|week|weeks)')
+_RE_FROM_TO = re.compile(r'from\s+' + _WEEKDAYS + r'\s+to\s+' + _WEEKDAYS)
+_RE_TIME = re.compile(r'at\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?')
+_RE_AMOUNT = re.compile(r'\d+')
+_RE_TICKET_STRIP = re.compile(r'\b(raise|ticket)\b')
+
+# Date anchors produced by _tokenize_dates
+(_ANCHOR_DEFAULT, _ANCHOR_WEEKDAY, _ANCHOR_TOMORROW, _ANCHOR_TODAY,
+ _ANCHOR_NEXT_WEEK, _ANCHOR_THIS_WEEK) = range(6)
+
+_WEEKDAY_IDS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+
+def _tokenize_dates(query_lower):
+    """
+    Reduces the date and time phrases of a query to a tuple of integers.
+
+    Depends only on the query text, so all regex work happens here and the
+    calendar arithmetic in `_compute_dates` runs on plain integers.
+
+    Returns:
+        tuple: (anchor, anchor_weekday, duration_days, range_start_weekday,
+                range_end_weekday, hour, minute). Absent fields are -1.
+    """
+    # 1. Check for "next [weekday]"
+    # 2. Check for "this [weekday]" - closest upcoming occurrence
+    # 3. Check for specific weekday without "next/this"
+    anchor, anchor_weekday = _ANCHOR_DEFAULT, -1
+    weekday_match = (_RE_NEXT_WD.search(query_lower)
+                     or _RE_THIS_WD.search(query_lower)
+                     or _RE_BARE_WD.search(query_lower))
+    if weekday_match:
+        anchor, anchor_weekday = _ANCHOR_WEEKDAY, _WEEKDAY_IDS[weekday_match.group(1)]
+    
+    # 4. Check for "tomorrow"
+    elif "tomorrow" in query_lower:
+        anchor = _ANCHOR_TOMORROW
+    
+    # 5. Check for "today"
+    elif "today" in query_lower:
+        anchor = _ANCHOR_TODAY
+    
+    # 6. Check for "next week"
+    elif "next week" in query_lower:
+        anchor = _ANCHOR_NEXT_WEEK
+    
+    # 7. Check for "this week"
+    elif "this week" in query_lower:
+        anchor = _ANCHOR_THIS_WEEK
+    
+    # 8. Check for duration (e.g., "3 days", "2 weeks")
+    duration = -1
+    duration_match = _RE_DURATION.search(query_lower)
+    if duration_match:
+        duration = int(duration_match.group(1))
+        if 'week' in duration_match.group(2):
+            duration *= 7  # Convert weeks to days
+    
+    # 9. Check for date ranges (e.g., "from Monday to Wednesday")
+    range_start = range_end = -1
+    from_to_match = _RE_FROM_TO.search(query_lower)
+    if from_to_match:
+        range_start = _WEEKDAY_IDS[from_to_match.group(1)]
+        range_end = _WEEKDAY_IDS[from_to_match.group(2)]
+    
+    # 10. Check for time extraction (for meetings)
+    hour, minute = 10, 0  # Default meeting time: 10:00 AM
+    time_match = _RE_TIME.search(query_lower)
+    if time_match:
+        hour = int(time_match.group(1))
+        minute = int(time_match.group(2)) if time_match.group(2) else 0
+        meridiem = time_match.group(3)
+        
+        # Convert to 24-hour format
+        if meridiem == 'pm' and hour != 12:
+            hour += 12
+        elif meridiem == 'am' and hour == 12:
+            hour = 0
+        elif not meridiem and hour < 9:  # Assume PM for hours < 9 if no meridiem
+            hour += 12
+    
+    return (anchor, anchor_weekday, duration, range_start, range_end, hour, minute)
+
+
+def _compute_dates(tokens, today_ordinal, today_weekday):
+    """
+    Resolves the integer tokens from `_tokenize_dates` against today's date.
+    
+    Works on proleptic Gregorian ordinals only, so no datetime objects are
+    created until the caller builds the final result.
+    
+    Returns:
+        tuple: (start_ordinal, end_ordinal, hour, minute)
+    """
+    anchor, anchor_weekday, duration, range_start, range_end, hour, minute = tokens
+    
+    def get_next_weekday(target_day):
+        """Returns the next occurrence of the specified weekday (next week's if it is today)."""
+        return today_ordinal + (target_day - today_weekday - 1) % 7 + 1
+    
+    start = today_ordinal + 1  # Default: tomorrow
+    end = start  # Default: single day
+    
+    if anchor == _ANCHOR_WEEKDAY:
+        start = get_next_weekday(anchor_weekday)
+        end = start
+    elif anchor == _ANCHOR_TOMORROW:
+        start = today_ordinal + 1
+        end = start
+    elif anchor == _ANCHOR_TODAY:
+        start = today_ordinal
+        end = start
+    elif anchor == _ANCHOR_NEXT_WEEK:
+        start = today_ordinal + 7
+        end = start + 4  # Assume full week (Mon-Fri)
+    elif anchor == _ANCHOR_THIS_WEEK:
+        # Start from next working day, end on Friday of current week
+        start = today_ordinal + 1
+        days_until_friday = (4 - today_weekday) % 7
+        if days_until_friday == 0:
+            days_until_friday = 7
+        end = today_ordinal + days_until_friday
+    
+    if duration != -1:
+        end = start + duration - 1
+    
+    if range_start != -1:
+        start = get_next_weekday(range_start)
+        end = get_next_weekday(range_end)
+        
+        # If end is before start, end must be in the following week
+        if end <= start:
+            end += 7
+    
+    return start, end, hour, minute
 
 class ActionEngine:
     """
@@ -14,6 +208,89 @@ class ActionEngine:
     4. CLAIM_ALLOWANCE
     5. ESCALATE_TO_HUMAN
     """
+
+    # Pre-rendered payloads in the same layout as json.dumps(payload, indent=2).
+    # Enum, date and numeric slots are substituted directly; free-text slots
+    # taken from the query are JSON-encoded before substitution.
+    _INFORMATIONAL_RESPONSE = _dumps({
+        "intent": "Informational",
+        "answer": "I can help you Apply Leave, Raise Tickets, Schedule Meetings, Claim Allowances, or Escalate issues. How can I assist?"
+    })
+
+    _APPLY_LEAVE_TEMPLATE = """{
+  "intent": "Action",
+  "json": {
+    "action_type": "APPLY_LEAVE",
+    "parameters": {
+      "leave_type": "%(leave_type)s",
+      "start_date": "%(start_date)s",
+      "end_date": "%(end_date)s",
+      "reason": "%(reason)s"
+    },
+    "verification": "PENDING_APPROVAL"
+  }
+}"""
+
+    _RAISE_TICKET_TEMPLATE = """{
+  "intent": "Action",
+  "json": {
+    "action_type": "RAISE_TICKET",
+    "parameters": {
+      "category": "%(category)s",
+      "priority": "%(priority)s",
+      "subject": "User Reported Issue",
+      "description": %(description)s
+    },
+    "verification": "TICKET_CREATED"
+  }
+}"""
+
+    _SCHEDULE_MEETING_TEMPLATE = """{
+  "intent": "Action",
+  "json": {
+    "action_type": "SCHEDULE_MEETING",
+    "parameters": {
+      "department": "%(department)s",
+      "date_time": "%(date_time)s",
+      "topic": %(topic)s
+    },
+    "verification": "SLOT_BOOKED"
+  }
+}"""
+
+    _CLAIM_ALLOWANCE_TEMPLATE = """{
+  "intent": "Action",
+  "json": {
+    "action_type": "CLAIM_ALLOWANCE",
+    "parameters": {
+      "category": "%(category)s",
+      "amount": %(amount)d,
+      "justification": "Reimbursement for %(category_lower)s"
+    },
+    "policy_check": {
+      "eligible": %(eligible)s,
+      "reason": "%(reason)s"
+    }
+  }
+}"""
+
+    _ESCALATION_TEMPLATE = """{
+  "intent": "Action",
+  "json": {
+    "action_type": "ESCALATE_TO_HUMAN",
+    "parameters": {
+      "reason": "COMPLEXITY",
+      "summary": "User requested escalation or expressed frustration.",
+      "urgency": "%(urgency)s"
+    },
+    "verification": "HUMAN_HANDOFF"
+  }
+}"""
+
+    def __init__(self):
+        # Memoized per instance: an lru_cache on the method itself would be shared by
+        # the class and keep every engine (and its bound render methods) alive
+        self._dispatch = functools.lru_cache(maxsize=4096)(self._dispatch_query)
     
     def execute(self, query: str) -> str:
         """
@@ -26,305 +303,183 @@ class ActionEngine:
             str: A JSON string strictly adhering to the defined Agentic Schemas,
                  or a plain text string if the mock engine detects a Forbidden/Informational query.
         """
-        query_lower = query.lower().strip()
+        response, render = self._dispatch(query.lower().strip())
+        
+        # Date-dependent actions are completed per call so relative dates follow the clock
+        if render is not None:
+            return render(*response)
+        return response
+
+    def _dispatch_query(self, query_lower):
+        """
+        Runs guardrails and intent detection on a normalized query.
+        
+        Depends only on the query text, so results are memoized.
+        
+        Returns:
+            tuple: (response, None) for a finished response, or (args, render) for
+                   date-dependent actions where `render(*args)` builds the payload.
+        """
+        mask = _KEYWORDS.scan(query_lower)
 
         # 1. GUARDRAILS
         
         # Forbidden: Approve/Reject Requests
-        if any(w in query_lower for w in ["approve", "reject", "authorize"]) and \
-           any(w in query_lower for w in ["request", "application", "leave", "expense"]):
-             return "I cannot approve requests. Please contact your manager."
+        if mask & APPROVE and mask & REQUEST_NOUN:
+             return "I cannot approve requests. Please contact your manager.", None
         
         # Forbidden: Modify Salary/Contracts
-        if any(w in query_lower for w in ["modify", "change", "increase", "decrease", "update"]) and \
-           any(w in query_lower for w in ["salary", "contract", "pay", "compensation", "ctc"]):
-             return "I cannot modify contracts. Please raise a Payroll ticket."
+        if mask & MODIFY and mask & SALARY_NOUN:
+             return "I cannot modify contracts. Please raise a Payroll ticket.", None
         
         # Forbidden: View Other's Data
-        if "view" in query_lower and any(w in query_lower for w in ["other", "colleague", "employee", "manager", "peer"]):
-             return "I can only access your personal records."
+        if mask & VIEW and mask & OTHERS:
+             return "I can only access your personal records.", None
              
         # Forbidden: Terminate/Hire
-        if any(w in query_lower for w in ["fire", "terminate", "hire", "recruit"]) and \
-           not any(w in query_lower for w in ["meeting", "schedule"]): # Exception for scheduling
-             return "I cannot perform strategic HR functions like hiring or termination."
+        if mask & STRATEGIC and not mask & SCHEDULING_EXEMPT: # Exception for scheduling
+             return "I cannot perform strategic HR functions like hiring or termination.", None
 
         # 2. INTENT DETECTION & MOCK EXECUTION
         
         # ACTION 1: APPLY_LEAVE
         # Workflow: Transactional (Write)
-        if any(w in query_lower for w in ["leave", "time off", "vacation", "sick day"]):
-            return self._handle_apply_leave(query_lower)
+        if mask & LEAVE:
+            return self._handle_apply_leave(query_lower, mask)
             
         # ACTION 2: RAISE_TICKET
         # Workflow: Support (Track)
-        elif any(w in query_lower for w in ["ticket", "issue", "it support", "bug", "software", "laptop", "access", "payroll issue"]):
-            return self._handle_raise_ticket(query_lower)
+        elif mask & TICKET:
+            return self._handle_raise_ticket(query_lower, mask)
             
         # ACTION 3: SCHEDULE_MEETING
         # Workflow: Coordination (Calendar)
-        elif any(w in query_lower for w in ["meeting", "schedule", "calendar", "meet with", "appointment"]):
-            return self._handle_schedule_meeting(query_lower)
+        elif mask & MEETING:
+            return self._handle_schedule_meeting(query_lower, mask)
             
         # ACTION 4: CLAIM_ALLOWANCE
         # Workflow: Policy-Reasoned (Eligibility Check)
-        elif any(w in query_lower for w in ["allowance", "reimburse", "claim", "expense", "bill", "stipend"]):
-            return self._handle_claim_allowance(query_lower)
+        elif mask & ALLOWANCE:
+            return self._handle_claim_allowance(query_lower, mask)
         
         # ACTION 5: ESCALATE_TO_HUMAN
         # Workflow: Safety & Fallback
-        elif any(w in query_lower for w in ["escalate", "human", "talk to", "person", "representative", "complaint", "frustrated"]):
-             return self._handle_escalation(query_lower)
+        elif mask & ESCALATE:
+             return self._handle_escalation(query_lower, mask)
 
         # Fallback: No Action Detected -> Return strictly generic info intent or let Adapter handle.
         # Returning a safe non-action JSON structure.
-        return json.dumps({
-            "intent": "Informational",
-            "answer": "I can help you Apply Leave, Raise Tickets, Schedule Meetings, Claim Allowances, or Escalate issues. How can I assist?"
-        }, indent=2)
+        return self._INFORMATIONAL_RESPONSE, None
 
     # 3. SHARED DATE PARSING UTILITY
     
-    def _parse_date_from_query(self, query_lower, return_range=False):
+    def _resolve_dates(self, date_tokens, return_range=False):
         """
-        Shared intelligent date extraction from natural language.
+        Shared date resolution against the current clock.
         
         Args:
-            query_lower (str): Lowercase query string
+            date_tokens (tuple): Output of `_tokenize_dates` for the query
             return_range (bool): If True, returns (start, end) tuple. If False, returns single date.
         
         Returns:
             datetime or tuple: Parsed date(s)
         """
         today = datetime.now()
-        start = today + timedelta(days=1)  # Default: tomorrow
-        end = start  # Default: single day
-        
-        # Helper function to get next occurrence of a weekday
-        def get_next_weekday(target_day_name):
-            """Returns the next occurrence of the specified weekday."""
-            days_of_week = {
-                'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-                'friday': 4, 'saturday': 5, 'sunday': 6
-            }
-            target_day = days_of_week.get(target_day_name.lower())
-            if target_day is None:
-                return today + timedelta(days=1)
-            
-            current_day = today.weekday()
-            days_ahead = (target_day - current_day) % 7
-            if days_ahead == 0:  # If it's today, get next week's occurrence
-                days_ahead = 7
-            return today + timedelta(days=days_ahead)
-        
-        # Pattern matching for date extraction
-        
-        # 1. Check for "next [weekday]"
-        next_day_match = re.search(r'next\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)', query_lower)
-        if next_day_match:
-            day_name = next_day_match.group(1)
-            start = get_next_weekday(day_name)
-            end = start
+        start_ordinal, end_ordinal, hour, minute = _compute_dates(
+            date_tokens, today.toordinal(), today.weekday())
         
-        # 2. Check for "this [weekday]" - closest upcoming occurrence
-        elif re.search(r'this\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)', query_lower):
-            this_day_match = re.search(r'this\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)', query_lower)
-            day_name = this_day_match.group(1)
-            start = get_next_weekday(day_name)
-            end = start
-        
-        # 3. Check for specific weekday without "next/this"
-        elif re.search(r'\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', query_lower):
-            weekday_match = re.search(r'\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', query_lower)
-            day_name = weekday_match.group(1)
-            start = get_next_weekday(day_name)
-            end = start
-        
-        # 4. Check for "tomorrow"
-        elif "tomorrow" in query_lower:
-            start = today + timedelta(days=1)
-            end = start
-        
-        # 5. Check for "today"
-        elif "today" in query_lower:
-            start = today
-            end = start
-        
-        # 6. Check for "next week"
-        elif "next week" in query_lower:
-            start = today + timedelta(days=7)
-            end = start + timedelta(days=4)  # Assume full week (Mon-Fri)
-        
-        # 7. Check for "this week"
-        elif "this week" in query_lower:
-            # Start from next working day
-            start = today + timedelta(days=1)
-            # End on Friday of current week
-            days_until_friday = (4 - today.weekday()) % 7
-            if days_until_friday == 0:
-                days_until_friday = 7
-            end = today + timedelta(days=days_until_friday)
-        
-        # 8. Check for duration (e.g., "3 days", "2 weeks")
-        duration_match = re.search(r'(\d+)\s*(day|days|week|weeks)', query_lower)
-        if duration_match:
-            num = int(duration_match.group(1))
-            unit = duration_match.group(2)
-            
-            if 'week' in unit:
-                num *= 7  # Convert weeks to days
-            
-            # If we haven't set a custom start date yet, use tomorrow
-            if start == today + timedelta(days=1) and "tomorrow" not in query_lower:
-                # Check if there's a starting reference
-                if any(word in query_lower for word in ["from tomorrow", "starting tomorrow"]):
-                    start = today + timedelta(days=1)
-                elif "from" in query_lower and "next" in query_lower:
-                    # Already handled above
-                    pass
-                else:
-                    start = today + timedelta(days=1)
-            
-            end = start + timedelta(days=num - 1)
-        
-        # 9. Check for date ranges (e.g., "from Monday to Wednesday")
-        from_to_match = re.search(r'from\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\s+to\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)', query_lower)
-        if from_to_match:
-            start_day = from_to_match.group(1)
-            end_day = from_to_match.group(2)
-            start = get_next_weekday(start_day)
-            end = get_next_weekday(end_day)
-            
-            # If end is before start, end must be in the following week
-            if end <= start:
-                end = end + timedelta(days=7)
-        
-        # 10. Check for time extraction (for meetings)
-        time_match = re.search(r'at\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?', query_lower)
-        if time_match:
-            hour = int(time_match.group(1))
-            minute = int(time_match.group(2)) if time_match.group(2) else 0
-            meridiem = time_match.group(3)
-            
-            # Convert to 24-hour format
-            if meridiem == 'pm' and hour != 12:
-                hour += 12
-            elif meridiem == 'am' and hour == 12:
-                hour = 0
-            elif not meridiem and hour < 9:  # Assume PM for hours < 9 if no meridiem
-                hour += 12
-            
-            start = start.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            end = end.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        else:
-            # Default meeting time: 10:00 AM
-            start = start.replace(hour=10, minute=0, second=0, microsecond=0)
-            end = end.replace(hour=10, minute=0, second=0, microsecond=0)
-        
-        return (start, end) if return_range else start
+        start = datetime.fromordinal(start_ordinal).replace(hour=hour, minute=minute)
+        if not return_range:
+            return start
+        return start, datetime.fromordinal(end_ordinal).replace(hour=hour, minute=minute)
 
     # 4. ACTION HANDLERS (Mock Slot Filling)
 
-    def _handle_apply_leave(self, query):
-        """Generates payload for APPLY_LEAVE action with intelligent date extraction."""
+    def _handle_apply_leave(self, query, mask):
+        """Fills the date-independent APPLY_LEAVE slots; see `_render_apply_leave`."""
         # Simple keyword slot mapping
         leave_type = "ANNUAL" # Default
-        if "sick" in query: leave_type = "SICK"
-        elif "casual" in query: leave_type = "CASUAL"
+        if mask & SICK: leave_type = "SICK"
+        elif mask & CASUAL: leave_type = "CASUAL"
         
-        # Use shared date parser
-        start, end = self._parse_date_from_query(query, return_range=True)
+        reason = "Personal"
+        if mask & SICK: reason = "Medical reasons"
+        elif mask & EMERGENCY: reason = "Emergency"
+        elif mask & FAMILY: reason = "Family matters"
+        
+        return (leave_type, reason, _tokenize_dates(query)), self._render_apply_leave
+
+    def _render_apply_leave(self, leave_type, reason, date_tokens):
+        """Generates payload for APPLY_LEAVE action with intelligent date extraction."""
+        # Use shared date resolver
+        start, end = self._resolve_dates(date_tokens, return_range=True)
         
         # Format dates
         start_date = start.strftime("%Y-%m-%d")
         end_date = end.strftime("%Y-%m-%d")
         
-        reason = "Personal"
-        if "sick" in query: reason = "Medical reasons"
-        elif "emergency" in query: reason = "Emergency"
-        elif "family" in query: reason = "Family matters"
-        
-        payload = {
-            "intent": "Action",
-            "json": {
-                "action_type": "APPLY_LEAVE",
-                "parameters": {
-                    "leave_type": leave_type,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "reason": reason
-                },
-                "verification": "PENDING_APPROVAL"
-            }
+        return self._APPLY_LEAVE_TEMPLATE % {
+            "leave_type": leave_type,
+            "start_date": start_date,
+            "end_date": end_date,
+            "reason": reason
         }
-        return json.dumps(payload, indent=2)
 
-    def _handle_raise_ticket(self, query):
+    def _handle_raise_ticket(self, query, mask):
         """Generates payload for RAISE_TICKET action."""
         category = "IT" # Default
-        if "payroll" in query: category = "PAYROLL"
-        elif "benefit" in query: category = "BENEFITS"
+        if mask & PAYROLL: category = "PAYROLL"
+        elif mask & BENEFIT: category = "BENEFITS"
         
         priority = "NORMAL"
-        if any(w in query for w in ["urgent", "critical", "blocking", "immediately"]): 
+        if mask & TICKET_URGENT: 
             priority = "HIGH"
             
-        payload = {
-            "intent": "Action",
-            "json": {
-                "action_type": "RAISE_TICKET",
-                "parameters": {
-                    "category": category,
-                    "priority": priority,
-                    "subject": "User Reported Issue", # Mock
-                    "description": query.replace("raise", "").replace("ticket", "").strip().capitalize() or "User reported issue"
-                },
-                "verification": "TICKET_CREATED"
-            }
-        }
-        return json.dumps(payload, indent=2)
+        description = _RE_TICKET_STRIP.sub('', query).strip().capitalize() or "User reported issue"
+        return self._RAISE_TICKET_TEMPLATE % {
+            "category": category,
+            "priority": priority,
+            "description": _dumps(description)
+        }, None
 
-    def _handle_schedule_meeting(self, query):
-        """Generates payload for SCHEDULE_MEETING action with intelligent date/time extraction."""
+    def _handle_schedule_meeting(self, query, mask):
+        """Fills the date-independent SCHEDULE_MEETING slots; see `_render_schedule_meeting`."""
         department = "HR_BP" # Default
-        if "recruit" in query: department = "RECRUITMENT"
-        elif "payroll" in query: department = "PAYROLL"
-        elif "it" in query: department = "IT"
+        if mask & RECRUIT: department = "RECRUITMENT"
+        elif mask & PAYROLL: department = "PAYROLL"
+        elif mask & IT_DEPT: department = "IT"
         
-        # Use shared date parser
-        meeting_datetime = self._parse_date_from_query(query, return_range=False)
-        meeting_str = meeting_datetime.isoformat()
-        
-        # Extract topic if possible
+        # Extract topic if possible: the words after "about", up to " on " / " at "
         topic = "Discussion on " + ("Recruitment" if department == "RECRUITMENT" else "HR Policies")
         if "about" in query:
-            about_match = re.search(r'about\s+(.+?)(?:\s+on|\s+at|$)', query)
-            if about_match:
-                topic = about_match.group(1).strip().capitalize()
+            _, about, tail = (" " + query).partition(" about ")
+            if about:
+                cut = min((i for i in (tail.find(" on "), tail.find(" at ")) if i != -1), default=len(tail))
+                topic = tail[:cut].strip().capitalize() or topic
+        
+        return (department, _dumps(topic), _tokenize_dates(query)), self._render_schedule_meeting
+
+    def _render_schedule_meeting(self, department, topic_json, date_tokens):
+        """Generates payload for SCHEDULE_MEETING action with intelligent date/time extraction."""
+        # Use shared date resolver
+        meeting_datetime = self._resolve_dates(date_tokens, return_range=False)
+        meeting_str = meeting_datetime.isoformat()
         
-        payload = {
-            "intent": "Action",
-            "json": {
-                "action_type": "SCHEDULE_MEETING",
-                "parameters": {
-                    "department": department,
-                    "date_time": meeting_str,
-                    "topic": topic
-                },
-                "verification": "SLOT_BOOKED"
-            }
+        return self._SCHEDULE_MEETING_TEMPLATE % {
+            "department": department,
+            "date_time": meeting_str,
+            "topic": topic_json
         }
-        return json.dumps(payload, indent=2)
 
-    def _handle_claim_allowance(self, query):
+    def _handle_claim_allowance(self, query, mask):
         """Generates payload for CLAIM_ALLOWANCE action with Policy Logic."""
         category = "RELOCATION" # Default
-        if "internet" in query: category = "INTERNET"
-        elif "education" in query: category = "EDUCATION"
+        if mask & INTERNET: category = "INTERNET"
+        elif mask & EDUCATION: category = "EDUCATION"
         
         # Mock Amount Extraction
         amount = 0
-        amount_match = re.search(r'\d+', query)
+        amount_match = _RE_AMOUNT.search(query)
         if amount_match:
             amount = int(amount_match.group())
             
@@ -336,39 +491,18 @@ class ActionEngine:
             # eligible = False # For now, let's allow it but warn, or strictly stick to boolean
             reason = "Warning: High amount, requires secondary approval"
             
-        payload = {
-            "intent": "Action",
-            "json": {
-                "action_type": "CLAIM_ALLOWANCE",
-                "parameters": {
-                    "category": category,
-                    "amount": amount,
-                    "justification": f"Reimbursement for {category.lower()}"
-                },
-                "policy_check": {
-                    "eligible": eligible,
-                    "reason": reason
-                }
-            }
-        }
-        return json.dumps(payload, indent=2)
+        return self._CLAIM_ALLOWANCE_TEMPLATE % {
+            "category": category,
+            "amount": amount,
+            "category_lower": category.lower(),
+            "eligible": "true" if eligible else "false",
+            "reason": reason
+        }, None
 
-    def _handle_escalation(self, query):
+    def _handle_escalation(self, query, mask):
         """Generates payload for ESCALATE_TO_HUMAN action."""
         urgency = "NORMAL"
-        if any(w in query for w in ["urgent", "anger", "frustrated", "immediately"]):
+        if mask & ESCALATION_URGENT:
             urgency = "HIGH"
             
-        payload = {
-            "intent": "Action",
-            "json": {
-                "action_type": "ESCALATE_TO_HUMAN",
-                "parameters": {
-                    "reason": "COMPLEXITY", # Default
-                    "summary": "User requested escalation or expressed frustration.",
-                    "urgency": urgency
-                },
-                "verification": "HUMAN_HANDOFF"
-            }
-        }
-        return json.dumps(payload, indent=2)
+        return self._ESCALATION_TEMPLATE % {"urgency": urgency}, None
@@ -0,0 +1,85 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+
+class CacheStore:
+    """
+    SQLite persistence for answered queries, so caches survive CLI restarts.
+
+    Each row keeps the query text, its normalized float32 embedding (BLOB), the
+    answer and intent, and the wall-clock time it was stored. Rows are scoped by
+    `namespace` (the knowledge base's artifact key), so embeddings and answers
+    produced for a different PDF, model or chunking are never reused. Only the
+    newest `max_rows` rows of the namespace are kept. Rows do not expire here:
+    embeddings stay valid while the namespace matches, and answer freshness is
+    left to the in-memory cache. Any SQLite error disables the store; the agent
+    then runs with in-memory caches only.
+    """
+
+    def __init__(self, path: str, namespace: str, max_rows: int):
+        self.namespace = namespace
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " query_sha256 TEXT PRIMARY KEY,"
+                " namespace TEXT NOT NULL,"
+                " query TEXT NOT NULL,"
+                " embedding BLOB NOT NULL,"
+                " response TEXT NOT NULL,"
+                " intent TEXT NOT NULL,"
+                " ts REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_ts ON answers (namespace, ts)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Query cache database unavailable ({e}), caching in memory only.")
+            self._conn = None
+
+    def _key(self, query: str) -> str:
+        return hashlib.sha256(f"{self.namespace}|{query}".encode()).hexdigest()
+
+    def load(self, limit: int) -> Iterator[Tuple[str, np.ndarray, str, str, float]]:
+        """Yields (query, (1, d) embedding, response, intent, ts) for the newest `limit` rows, oldest first."""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT query, embedding, response, intent, ts FROM answers"
+                    " WHERE namespace = ? ORDER BY ts DESC LIMIT ?",
+                    (self.namespace, limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to load query cache: {e}")
+            return
+        for query, blob, response, intent, ts in reversed(rows):
+            yield query, np.frombuffer(blob, dtype=np.float32).reshape(1, -1), response, intent, ts
+
+    def save(self, query: str, query_vec: np.ndarray, response: str, intent: str):
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self._key(query), self.namespace, query,
+                     np.asarray(query_vec, dtype=np.float32).tobytes(), response, intent, time.time())
+                )
+                self._conn.execute(
+                    "DELETE FROM answers WHERE namespace = ? AND ts < ("
+                    " SELECT ts FROM answers WHERE namespace = ? ORDER BY ts DESC LIMIT 1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_rows - 1)
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to persist query cache entry: {e}")
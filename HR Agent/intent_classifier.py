@@ -1,12 +1,27 @@
+from keyword_matcher import KeywordMatcher
+
+# Intent keyword buckets, one bit each
+ACTION, COMPARATIVE, POLICY = 1, 2, 4
+
+_ACTION_WORDS = frozenset({"apply", "schedule", "book", "raise", "create"})
+_COMPARATIVE_WORDS = frozenset({"compare", "difference", "versus", "vs", "trend", "growth"})
+_POLICY_WORDS = frozenset({"policy", "eligible", "allowed", "rule", "exception", "can i"})
+
+_KEYWORDS = KeywordMatcher({
+    ACTION: _ACTION_WORDS,
+    COMPARATIVE: _COMPARATIVE_WORDS,
+    POLICY: _POLICY_WORDS,
+})
+
 class IntentClassifier:
     def classify(self, query: str) -> str:
         """Classifies intent: Informational, Policy, Comparative, Action."""
-        q = query.lower()
-        if any(w in q for w in ["apply", "schedule", "book", "raise", "create"]):
+        mask = _KEYWORDS.scan(query.lower())
+        if mask & ACTION:
             return "Action"
-        elif any(w in q for w in ["compare", "difference", "versus", "vs", "trend", "growth"]):
+        elif mask & COMPARATIVE:
             return "Comparative"
-        elif any(w in q for w in ["policy", "eligible", "allowed", "rule", "exception", "can i"]):
+        elif mask & POLICY:
             return "Policy"
         else:
             return "Informational"
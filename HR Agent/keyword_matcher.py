@@ -0,0 +1,87 @@
+import re
+from typing import Dict, Iterable
+
+try:
+    import hyperscan
+except ImportError:  # Optional accelerator
+    hyperscan = None
+
+try:
+    import ahocorasick
+except ImportError:  # Optional accelerator
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """
+    Single-pass multi-keyword scanner.
+
+    Maps every keyword to a bitmask of the categories it belongs to, then scans
+    the text once and returns the union of all categories that fired. Backends,
+    in order of preference: a Hyperscan database, a pyahocorasick automaton, or
+    one substring check per unique keyword.
+    """
+
+    def __init__(self, categories: Dict[int, Iterable[str]]):
+        """
+        Args:
+            categories (dict): Category bit -> keywords belonging to that category.
+        """
+        self.keyword_masks = {}
+        for bit, keywords in categories.items():
+            for keyword in keywords:
+                self.keyword_masks[keyword] = self.keyword_masks.get(keyword, 0) | bit
+
+        self._database = None
+        self._automaton = None
+        # Whether the active backend scans UTF-8 bytes rather than str
+        self.scans_bytes = False
+        if hyperscan is not None:
+            self._build_hyperscan()
+            self.scans_bytes = True
+        elif ahocorasick is not None:
+            # pyahocorasick is built either for str or (faster) for bytes keys
+            self.scans_bytes = not ahocorasick.unicode
+            self._build_automaton()
+
+    def _build_hyperscan(self):
+        """Compiles every keyword into one block-mode Hyperscan database."""
+        keywords = list(self.keyword_masks)
+        self._pattern_masks = [self.keyword_masks[k] for k in keywords]
+        self._database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        self._database.compile(
+            expressions=[re.escape(k).encode() for k in keywords],
+            ids=list(range(len(keywords))),
+            elements=len(keywords),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(keywords),
+        )
+
+    def _build_automaton(self):
+        self._automaton = ahocorasick.Automaton()
+        for keyword, mask in self.keyword_masks.items():
+            self._automaton.add_word(keyword.encode() if self.scans_bytes else keyword, mask)
+        self._automaton.make_automaton()
+
+    def scan(self, text: str) -> int:
+        """Returns the OR of the category bits of every keyword found in `text`."""
+        if self.scans_bytes:
+            # Encode once; byte-oriented backends then avoid walking wide str code points
+            text = text.encode()
+
+        if self._database is not None:
+            fired = []
+            self._database.scan(text, match_event_handler=lambda pattern_id, *_: fired.append(pattern_id))
+            mask = 0
+            for pattern_id in fired:
+                mask |= self._pattern_masks[pattern_id]
+            return mask
+
+        mask = 0
+        if self._automaton is not None:
+            for _, keyword_mask in self._automaton.iter(text):
+                mask |= keyword_mask
+        else:
+            for keyword, keyword_mask in self.keyword_masks.items():
+                if keyword in text:
+                    mask |= keyword_mask
+        return mask
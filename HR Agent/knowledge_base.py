@@ -1,10 +1,17 @@
 import os
+import asyncio
+import hashlib
+import json
 import logging
+import mmap
 import re
 import pickle
-from typing import List, Dict
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Iterator, Tuple
 from pypdf import PdfReader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from text_processing import WORD_RE, split_sentences
 from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
@@ -12,28 +19,105 @@ import numpy as np
 # Verify config import works or just use logging directly
 import logging
 
+# HNSW graph degree for the vector store, and candidate list sizes for build and search
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128
+
+# Int8 codes in the HNSW graph; no FP32 copy of the vectors is kept
+INDEX_QUANTIZER = faiss.ScalarQuantizer.QT_8bit
+
+# Query embeddings kept in memory, and encoder batch size for query embedding
+EMBED_CACHE_SIZE = 1024
+QUERY_BATCH_SIZE = 32
+
+# Text splitter settings; part of the artifact fingerprint
+CHUNK_SIZE = 1000 # Increased chunk size for better context
+CHUNK_OVERLAP = 200
+
+# Block size for hashing the source PDF
+FINGERPRINT_BLOCK_SIZE = 1 << 20
+
+# Int8-quantized ONNX export shipped with the sentence-transformers model repos
+ONNX_MODEL_FILE = 'onnx/model_qint8_avx512.onnx'
+
+# Key and encoder backend of the last artifacts built, for runs where the PDF is missing
+LATEST_ARTIFACTS_PATH = 'artifacts.latest.json'
+
+_WS_RE = re.compile(r'\s+')
+_FACT_RE = re.compile(r'\$|\d+%|\d+\s?days|\d+\s?years|limit|eligibility', re.IGNORECASE)
+
 class KnowledgeBase:
-    def __init__(self, embedding_model_name='all-MiniLM-L6-v2', index_path='faiss_index.bin', docs_path='documents.pkl'):
+    def __init__(self, embedding_model_name='all-MiniLM-L6-v2', index_path=None, docs_path=None, facts_path=None):
+        # Artifact paths left as None are named after the source fingerprint by ingest_pdf
         self.embedding_model_name = embedding_model_name
         self.encoder = None
+        self.encoder_backend = None # ONNX_MODEL_FILE, 'torch' or 'torch-fp16', set once the encoder loads
         self.vector_store = None
         self.documents = [] 
         self.structured_facts = [] 
+        self.fact_index = {} # token -> ids of structured facts containing it
         self.index_path = index_path
         self.docs_path = docs_path
+        self.facts_path = facts_path
+        self.fingerprint = None # Source PDF + settings key, set by ingest_pdf
+        self._embed_cache = OrderedDict() # text -> normalized float32 embedding, least recently used first
+        self._embed_lock = threading.Lock()
+        self._model_lock = threading.Lock() # Background warmup may race the first query
+        self._embed_hits = 0
+        self._embed_misses = 0
         
     def _load_model(self):
+        with self._model_lock:
+            self._load_model_locked()
+
+    def _load_model_locked(self):
         if self.encoder is None:
             logging.info(f"Loading embedding model: {self.embedding_model_name}")
-            self.encoder = SentenceTransformer(self.embedding_model_name)
+            try:
+                # ONNX Runtime backend (needs sentence-transformers>=3.2 and optimum[onnxruntime])
+                self.encoder = SentenceTransformer(
+                    self.embedding_model_name,
+                    backend='onnx',
+                    model_kwargs={'file_name': ONNX_MODEL_FILE}
+                )
+                self.encoder_backend = ONNX_MODEL_FILE
+            except Exception as e:
+                logging.warning(f"ONNX backend unavailable ({e}), using PyTorch backend.")
+                self.encoder = SentenceTransformer(self.embedding_model_name)
+                self.encoder_backend = 'torch'
+                if self.encoder.device.type == 'cuda':
+                    self.encoder.half()
+                    self.encoder_backend = 'torch-fp16'
 
     def load_existing_index(self):
-        if os.path.exists(self.index_path) and os.path.exists(self.docs_path):
+        if self.index_path and self.docs_path and self.facts_path and os.path.exists(self.index_path) and os.path.exists(self.docs_path):
             try:
                 logging.info(f"Loading existing artifacts from {self.index_path}...")
                 self.vector_store = faiss.read_index(self.index_path)
+                if self.vector_store.metric_type != faiss.METRIC_INNER_PRODUCT:
+                    # Artifacts from the old L2 index; rebuild so scores match the normalized embeddings
+                    logging.warning("Existing index does not use inner product similarity, rebuilding.")
+                    self.vector_store = None
+                    return False
+                if isinstance(self.vector_store, faiss.IndexRefine):
+                    # Artifacts that kept a full FP32 refine copy next to the int8 codes
+                    logging.warning("Existing index stores a refine copy of the vectors, rebuilding.")
+                    self.vector_store = None
+                    return False
+                self._set_ef_search()
                 with open(self.docs_path, 'rb') as f:
                     self.documents = pickle.load(f)
+                if os.path.exists(self.facts_path):
+                    with open(self.facts_path, 'rb') as f:
+                        self.structured_facts, self.fact_index = pickle.load(f)
+                # Artifacts saved before sentences were stored get them once here, not per query
+                for doc in self.documents:
+                    if 'sentences' not in doc:
+                        doc['sentences'] = split_sentences(doc['text'])
+                for fact in self.structured_facts:
+                    if 'sentences' not in fact:
+                        fact['sentences'] = split_sentences(f"FACT: {fact['fact']}")
                 logging.info(f"Loaded {len(self.documents)} documents and index of size {self.vector_store.ntotal}")
                 return True
             except Exception as e:
@@ -41,66 +125,112 @@ class KnowledgeBase:
                 return False
         return False
 
+    def _fingerprint(self, file_path: str) -> str:
+        """Hashes the PDF bytes together with every setting that shapes the stored artifacts.
+        The encoder backend is included, as int8 ONNX and FP32 PyTorch vectors must not be mixed."""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(FINGERPRINT_BLOCK_SIZE), b''):
+                digest.update(block)
+        digest.update(f"|{self.embedding_model_name}|{self.encoder_backend}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|{HNSW_M}|{INDEX_QUANTIZER}".encode())
+        return digest.hexdigest()[:16]
+
+    def _latest_artifacts_key(self):
+        """Returns the key recorded by the last build, or None if it was built with another encoder backend."""
+        try:
+            with open(LATEST_ARTIFACTS_PATH) as f:
+                latest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if latest.get('backend') != self.encoder_backend:
+            logging.warning(f"Saved artifacts were built with the {latest.get('backend')} encoder, "
+                            f"not {self.encoder_backend}; ignoring them.")
+            return None
+        return latest.get('key')
+
     def ingest_pdf(self, file_path: str):
+        # The fingerprint depends on which encoder backend loads
+        self._load_model()
+        if os.path.exists(file_path):
+            # Artifacts are keyed by content, so an edited PDF or changed settings trigger a rebuild
+            key = self.fingerprint = self._fingerprint(file_path)
+        else:
+            # Limited mode: fall back to the artifacts of the last build
+            key = self.fingerprint = self._latest_artifacts_key()
+        if key is not None:
+            self.index_path = self.index_path or f"{key}.faiss"
+            self.docs_path = self.docs_path or f"{key}.docs.pkl"
+            self.facts_path = self.facts_path or f"{key}.facts.pkl"
+
         # 1. Try Loading first
         if self.load_existing_index():
             return
 
         # 2. Ingest if no index
-        self._load_model()
         logging.info(f"Ingesting file: {file_path}")
         if not os.path.exists(file_path):
             logging.error(f"File not found: {file_path}")
             return
             
         try:
-            reader = PdfReader(file_path)
-            full_text_chunks = []
-            
-            for i, page in enumerate(reader.pages):
-                text = page.extract_text()
-                if text:
-                    # Basic cleaning: remove excessive whitespace, handle hyphens
-                    text = re.sub(r'\s+', ' ', text).strip()
-                    full_text_chunks.append({"page": i + 1, "text": text})
-            
-            logging.info(f"Extracted content from {len(full_text_chunks)} pages.")
-            self._process_chunks(full_text_chunks, os.path.basename(file_path))
+            # Map the file instead of buffering it; pypdf seeks into the mapping as pages are parsed
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                reader = PdfReader(mm)
+                self._process_chunks(self._iter_pages(reader), os.path.basename(file_path))
             
         except Exception as e:
             logging.error(f"Error reading PDF: {e}")
 
-    def _process_chunks(self, pages_data: List[Dict], source_name: str):
+    def _iter_pages(self, reader: PdfReader) -> Iterator[Tuple[int, str]]:
+        """Yields (page_number, cleaned_text) one page at a time, skipping empty pages."""
+        for i, page in enumerate(reader.pages):
+            text = page.extract_text()
+            if text:
+                # Basic cleaning: remove excessive whitespace, handle hyphens
+                text = _WS_RE.sub(' ', text).strip()
+                yield i + 1, text
+
+    def _process_chunks(self, pages: Iterator[Tuple[int, str]], source_name: str):
         text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, # Increased chunk size for better context
-            chunk_overlap=200,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
             separators=["\n\n", "\n", ". ", " ", ""]
         )
         
         all_splits = []
-        for page in pages_data:
+        page_count = 0
+        for page_no, text in pages:
+            page_count += 1
+            
             # A. Semantic Splitting
-            splits = text_splitter.split_text(page["text"])
+            splits = text_splitter.split_text(text)
             for split in splits:
                 all_splits.append({
                     "text": split,
                     "source": source_name,
-                    "page": page["page"],
-                    "type": "semantic"
+                    "page": page_no,
+                    "type": "semantic",
+                    "sentences": split_sentences(split) # Reused by the offline answer extractor
                 })
             
             # B. Deterministic Extraction (Heuristic)
-            lines = page["text"].split('\n')
-            for line in lines:
-                if re.search(r'(\$|\d+%|\d+\s?days|\d+\s?years|Limit|Eligibility)', line, re.IGNORECASE):
-                    self.structured_facts.append({
-                        "fact": line.strip(),
-                        "source": source_name,
-                        "page": page["page"],
-                        "type": "deterministic"
-                    })
+            # Cleaning already collapsed newlines, so each page is tested as a single line
+            if _FACT_RE.search(text):
+                fact_id = len(self.structured_facts)
+                self.structured_facts.append({
+                    "fact": text,
+                    "source": source_name,
+                    "page": page_no,
+                    "type": "deterministic",
+                    "sentences": split_sentences(f"FACT: {text}") # Same text the LLM interface renders
+                })
+                for token in set(WORD_RE.findall(text.lower())):
+                    self.fact_index.setdefault(token, []).append(fact_id)
+        # Posting lists as int arrays so query_structured can count overlaps with np.bincount
+        self.fact_index = {token: np.asarray(ids, dtype=np.int32) for token, ids in self.fact_index.items()}
         
         self.documents = all_splits
+        logging.info(f"Extracted content from {page_count} pages.")
         logging.info(f"Created {len(self.documents)} semantic chunks.")
         
         self._build_vector_store()
@@ -110,14 +240,26 @@ class KnowledgeBase:
             return
         
         # Batch processing for embeddings
-        batch_size = 32
+        batch_size = 256
         texts = [doc["text"] for doc in self.documents]
         logging.info(f"Generating embeddings for {len(texts)} chunks...")
         
         self._load_model()
-        embeddings = self.encoder.encode(texts, batch_size=batch_size, show_progress_bar=True)
+        embeddings = self.encoder.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=True,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
         
-        self.vector_store = faiss.IndexFlatL2(embeddings.shape[1])
+        # HNSW graph over int8 scalar-quantized vectors: sublinear search with a quarter of
+        # the FP32 vector memory. Unlike IVF/PQ it needs no minimum training set size.
+        # Embeddings are L2-normalized, so inner product ranks by cosine similarity.
+        self.vector_store = faiss.IndexHNSWSQ(embeddings.shape[1], INDEX_QUANTIZER, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        self.vector_store.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        self._set_ef_search()
+        self.vector_store.train(embeddings)
         self.vector_store.add(embeddings)
         logging.info(f"Vector store built. Index size: {self.vector_store.ntotal}")
 
@@ -126,24 +268,92 @@ class KnowledgeBase:
             faiss.write_index(self.vector_store, self.index_path)
             with open(self.docs_path, 'wb') as f:
                 pickle.dump(self.documents, f)
+            with open(self.facts_path, 'wb') as f:
+                pickle.dump((self.structured_facts, self.fact_index), f)
+            if self.fingerprint is not None:
+                with open(LATEST_ARTIFACTS_PATH, 'w') as f:
+                    json.dump({'key': self.fingerprint, 'backend': self.encoder_backend}, f)
             logging.info("Saved index and documents to disk.")
         except Exception as e:
             logging.error(f"Failed to save artifacts: {e}")
 
 
+    def _set_ef_search(self):
+        # Indexes saved before the efSearch tuning load with the FAISS default of 16
+        if hasattr(self.vector_store, 'hnsw'):
+            self.vector_store.hnsw.efSearch = HNSW_EF_SEARCH
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Returns the normalized (n, d) float32 embeddings of `texts`.
+
+        Embeddings are memoized on the exact text; every text not yet cached is
+        encoded in a single batched encoder call.
+        """
+        cached = {}
+        with self._embed_lock:
+            for text in texts:
+                vec = self._embed_cache.get(text)
+                if vec is not None:
+                    self._embed_cache.move_to_end(text)
+                    cached[text] = vec
+        missing = [t for t in dict.fromkeys(texts) if t not in cached]
+
+        if missing:
+            self._load_model()
+            vecs = self.encoder.encode(
+                missing,
+                batch_size=QUERY_BATCH_SIZE,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+            vecs = np.asarray(vecs, dtype=np.float32)
+            with self._embed_lock:
+                for text, vec in zip(missing, vecs):
+                    cached[text] = vec
+                    self._embed_cache[text] = vec
+                while len(self._embed_cache) > EMBED_CACHE_SIZE:
+                    self._embed_cache.popitem(last=False)
+
+        with self._embed_lock:
+            self._embed_misses += len(missing)
+            self._embed_hits += len(texts) - len(missing)
+            logging.debug(f"Query embedding cache: {self._embed_hits} hits / {self._embed_misses} misses")
+        return np.stack([cached[t] for t in texts])
+
+    def cache_embedding(self, text: str, vec: np.ndarray):
+        """Seeds the embedding cache, e.g. with embeddings persisted by an earlier session."""
+        with self._embed_lock:
+            self._embed_cache[text] = np.asarray(vec, dtype=np.float32).reshape(-1)
+            while len(self._embed_cache) > EMBED_CACHE_SIZE:
+                self._embed_cache.popitem(last=False)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Returns the normalized (1, d) float32 embedding of `query`."""
+        return self.embed_batch([query])
+
     def query_similarity(self, query: str, k=5) -> List[Dict]:
         if self.vector_store is None: return []
-        self._load_model()
-        query_vec = self.encoder.encode([query], show_progress_bar=False)
+        query_vec = self.embed_query(query)
         distances, indices = self.vector_store.search(query_vec, k)
         return [self.documents[i] for i in indices[0] if i != -1 and i < len(self.documents)]
 
+    async def query_similarity_async(self, query: str, k=5) -> List[Dict]:
+        # FAISS releases the GIL during search, so a worker thread overlaps with other retrieval
+        return await asyncio.to_thread(self.query_similarity, query, k)
+
+    async def query_structured_async(self, query: str) -> List[Dict]:
+        return await asyncio.to_thread(self.query_structured, query)
+
     def query_structured(self, query: str) -> List[Dict]:
-        # Heuristic keyword match on structured facts
-        keywords = query.lower().split()
-        results = []
-        for fact in self.structured_facts:
-            fact_text = fact["fact"].lower()
-            if any(k in fact_text for k in keywords):
-                results.append(fact)
-        return results[:5] 
+        # Heuristic keyword match on structured facts via the inverted index,
+        # ranked by the number of distinct query tokens each fact contains
+        postings = [self.fact_index[t] for t in set(WORD_RE.findall(query.lower())) if t in self.fact_index]
+        if not postings:
+            return []
+        overlap = np.bincount(np.concatenate(postings), minlength=len(self.structured_facts))
+        # Top 5 by overlap, ties broken by document order
+        matched = np.flatnonzero(overlap)
+        top = matched[np.lexsort((matched, -overlap[matched]))[:5]]
+        return [self.structured_facts[fact_id] for fact_id in top]
@@ -1,28 +1,77 @@
 import logging
 import time
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator
+import numpy as np
 from config import OPENAI_API_KEY
+from text_processing import WORD_RE, split_sentences
+
+# OpenRouter models tried in order
+MODELS = [
+    "xiaomi/mimo-v2-flash:free"
+]
+
+_STOPWORDS = frozenset({'what', 'is', 'the', 'are', 'for', 'of', 'in', 'to', 'a', 'an', 'rules', 'policy'})
+
+def _context_text(chunk: Dict) -> str:
+    """Text of a retrieved chunk; structured facts are rendered with a FACT: prefix."""
+    return chunk['text'] if 'text' in chunk else f"FACT: {chunk['fact']}"
 
 class LLMInterface:
     """Mock or Real LLM Interface."""
     def __init__(self):
         self.llm_disabled = False # Flag to disable LLM on rate limit
-
-    def generate_answer(self, query: str, context_chunks: List[Dict], intent: str) -> str:
         
-        # Prepare Context
-        context_str = "\n\n".join([f"[Page {c['page']}] {c.get('text', c.get('fact', ''))}" for c in context_chunks])
-        
-        # If API Key is available and not disabled managed by rate limits
-        if OPENAI_API_KEY and not self.llm_disabled:
+        # Built once so every request reuses the same HTTP connection pool
+        self._client = None
+        if OPENAI_API_KEY:
             try:
                 from openai import OpenAI
                 
-                client = OpenAI(
+                self._client = OpenAI(
                   base_url="https://openrouter.ai/api/v1",
                   api_key=OPENAI_API_KEY,
                 )
-                
+            except Exception as e:
+                logging.error(f"LLM client setup failed: {e}")
+
+    def warmup(self):
+        """Opens the OpenRouter connection with a 1-token completion so the first answer skips the handshake."""
+        if self._client is None or self.llm_disabled:
+            return
+        try:
+            self._client.chat.completions.create(
+                model=MODELS[0],
+                messages=[{"role": "user", "content": "ping"}],
+                max_tokens=1,
+            )
+        except Exception as e:
+            # Not fatal: the first real query goes through the normal retry/fallback path
+            logging.warning(f"LLM warmup failed: {e}")
+
+    def generate_answer(self, query: str, context_chunks: Iterable[Dict], intent: str, stream: bool = False):
+        """
+        Returns the formatted answer, or with `stream=True` an iterator over its text
+        as it is generated (online answers then arrive token by token).
+
+        `context_chunks` may mix semantic chunks ('text') and structured facts ('fact')
+        in any iterable, e.g. an itertools.chain of both retrieval results.
+        """
+        deltas = self._generate(query, context_chunks, intent, stream)
+        return deltas if stream else "".join(deltas)
+
+    def _generate(self, query: str, context_chunks: Iterable[Dict], intent: str, stream: bool) -> Iterator[str]:
+        
+        # Offline mode walks the context several times
+        context_chunks = list(context_chunks)
+
+        # Prepare Context
+        context_str = "\n\n".join([f"[Page {c['page']}] {_context_text(c)}" for c in context_chunks])
+        
+        started = False # Whether part of an online answer was already emitted
+
+        # If API Key is available and not disabled managed by rate limits
+        if self._client is not None and not self.llm_disabled:
+            try:
                 system_prompt = f"""
 You are an enterprise HR assistant. You must answer heavily based on the provided CONTEXT.
 Intent: {intent}
@@ -33,17 +82,13 @@ Rules:
 4. If the answer is NOT in the context, say "I cannot find this information in the documents."
 """
                 user_prompt = f"Context:\n{context_str}\n\nQuestion: {query}"
-                
-                MODELS = [
-                    "xiaomi/mimo-v2-flash:free"
-                ]
 
                 for model in MODELS:
                     try:
                         logging.info(f"Sending request to OpenRouter (Model: {model})...")
                         
                         # Using the exact call structure requested
-                        response = client.chat.completions.create(
+                        response = self._client.chat.completions.create(
                           model=model,
                           messages=[
                                   {
@@ -55,24 +100,42 @@ Rules:
                                     "content": user_prompt
                                   }
                                 ],
+                          stream=stream,
                           # extra_body={"reasoning": {"enabled": True}} # Disabled reasoning to save potential overhead
                         )
 
-                        # Extract the assistant message 
-                        message = response.choices[0].message
-                        answer = message.content
-
-                        # Success! Log and return (skipping other models)
-                        logging.info(f"Model {model} call successful. Returning response.")
-                        return f"""
+                        header = f"""
 ==================================================
 AGENT RESPONSE (Generated via OpenRouter: {model})
 Intent: {intent}
 --------------------------------------------------
-{answer}
+"""
+                        footer = """
 ==================================================
 """
+                        if stream:
+                            # Pass tokens through as they arrive
+                            started = True
+                            yield header
+                            for chunk in response:
+                                if chunk.choices and chunk.choices[0].delta.content:
+                                    yield chunk.choices[0].delta.content
+                            yield footer
+                            logging.info(f"Model {model} stream complete.")
+                            return
+
+                        # Extract the assistant message 
+                        message = response.choices[0].message
+                        answer = message.content
+
+                        # Success! Log and return (skipping other models)
+                        logging.info(f"Model {model} call successful. Returning response.")
+                        yield header + answer + footer
+                        return
                     except Exception as e:
+                        if started:
+                            # Part of the answer is already out; falling back would garble it
+                            raise
                         logging.warning(f"Model {model} failed with error: {e}")
                         time.sleep(1) # Short backoff
                         continue
@@ -83,13 +146,17 @@ Intent: {intent}
 
             except Exception as e:
                 logging.error(f"Global LLM Setup/Execution Error: {e}")
+                if started:
+                    # The stream broke mid-answer; appending the offline answer would garble it
+                    self.llm_disabled = True
+                    raise
                 
         
         # Fallback: Smart Extraction Mode (No LLM)
         # We attempt to extract the most relevant sentence from the top chunks.
         
         if not context_chunks:
-            return """
+            yield """
 ==================================================
 AGENT RESPONSE (Offline Mode)
 Intent: {}
@@ -97,42 +164,37 @@ Intent: {}
 **Status:** No relevant information found in the document.
 ==================================================
 """.format(intent)
+            return
 
         # 1. Gather all sentences from evidence
+        # Ingested chunks and facts carry pre-split sentences; other context is split here
         all_sentences = []
-        import re
         for c in context_chunks:
-            if 'text' in c:
-                clean_text = c['text'].replace('\n', ' ')
-                sentences = re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?)\s', clean_text)
-                for s in sentences:
-                    if len(s.strip()) > 10: # Filter noise
-                        all_sentences.append({'text': s.strip(), 'page': c['page']})
+            sentences = c.get('sentences')
+            if sentences is None:
+                sentences = split_sentences(_context_text(c))
+            for s, tokens in sentences:
+                all_sentences.append({'text': s, 'tokens': tokens, 'page': c['page']})
         
         # 2. Score sentences based on query keywords
-        import collections
-        query_words = set(re.findall(r'\w+', query.lower())) - {'what', 'is', 'the', 'are', 'for', 'of', 'in', 'to', 'a', 'an', 'rules', 'policy'}
+        query_words = frozenset(WORD_RE.findall(query.lower())) - _STOPWORDS
         
-        scored_sentences = []
-        for s in all_sentences:
-            score = 0
-            if not s['text']: continue
-            s_lower = s['text'].lower()
-            
-            # Keywork match
-            matches = sum(1 for w in query_words if w in s_lower)
-            score += matches * 2
-            
-            # Boost length slightly (prefer substantial sentences)
-            if len(s['text']) > 50:
-                score += 0.5
-                
-            if score > 0:
-                scored_sentences.append((score, s))
+        # Keyword match (2 per query word), boosting substantial sentences slightly
+        scores = np.fromiter(
+            (len(s['tokens'] & query_words) * 2
+             + (0.5 if len(s['text']) > 50 else 0)
+             for s in all_sentences),
+            dtype=np.float32,
+            count=len(all_sentences)
+        )
         
-        # 3. Sort and Select Top 3
-        scored_sentences.sort(key=lambda x: x[0], reverse=True)
-        top_sentences = [x[1] for x in scored_sentences[:3]]
+        # 3. Select Top 3 without sorting every sentence; ties keep document order
+        top = np.flatnonzero(scores > 0)
+        if len(top) > 3:
+            third_best = np.partition(scores[top], -3)[-3]
+            top = np.concatenate((top[scores[top] > third_best], top[scores[top] == third_best]))[:3]
+        top = top[np.lexsort((top, -scores[top]))]
+        top_sentences = [all_sentences[i] for i in top]
         
         # Formulate "Synthesized" Answer
         synthesized_text = ""
@@ -143,15 +205,15 @@ Intent: {}
         else:
             # Fallback 2: If no sentences matched keywords well, just dump the top chunk text
             top_chunk = context_chunks[0]
-            text_snippet = top_chunk.get('text', '')[:300].replace('\n', ' ')
+            text_snippet = _context_text(top_chunk)[:300].replace('\n', ' ')
             synthesized_text = f"Exact sentence match failed, but here is the most relevant section found:\n> \"...{text_snippet}...\" [Page {top_chunk['page']}]"
 
         evidence_summary = "\n".join([
-            f"- [PAGE {c['page']}] ...{c.get('text', '')[:100].replace(chr(10), ' ')}..." 
-            for c in context_chunks if 'text' in c
+            f"- [PAGE {c['page']}] ...{_context_text(c)[:100].replace(chr(10), ' ')}..." 
+            for c in context_chunks
         ])
         
-        return f"""
+        yield f"""
 ==================================================
 AGENT RESPONSE (Offline Mode - Rate Limit/No Key)
 Intent: {intent}
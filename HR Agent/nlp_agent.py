@@ -1,21 +1,127 @@
+import os
+
+# One query at a time suits a small OpenMP/BLAS team (less spin-wait and oversubscription).
+# Must be set before NumPy and FAISS load their thread pools; an explicit setting wins.
+# This is the only place the team size is chosen; NLP_Agent applies it to FAISS.
+def _omp_threads(default: int) -> int:
+    # OpenMP also accepts a per-nesting-level list such as "4,2"; the outer level is the team
+    try:
+        return max(1, int(os.environ.get("OMP_NUM_THREADS", "").split(",")[0]))
+    except ValueError:
+        return default
+
+FAISS_THREADS = _omp_threads(min(4, os.cpu_count() or 1))
+os.environ.setdefault("OMP_NUM_THREADS", str(FAISS_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(FAISS_THREADS))
+
+import asyncio
 import logging
+import threading
 import time
+from itertools import chain
+from typing import AsyncIterator, Dict, List, Tuple
+import faiss
+import numpy as np
 from knowledge_base import KnowledgeBase
 from intent_classifier import IntentClassifier
 from llm_interface import LLMInterface
 from action_engine import ActionEngine
+from semantic_cache import SemanticCache, SEMANTIC_CACHE_SIZE
+from cache_store import CacheStore
+
+# SQLite file that keeps answered queries across sessions
+CACHE_DB_PATH = 'cache.db'
+
+class QueryEmbedder:
+    """
+    Micro-batches query embeddings onto the knowledge base's encoder.
+
+    Coroutines awaiting `encode` in the same event-loop tick share one batch, so
+    concurrent queries cost one encoder call instead of one each. The encoder
+    runs on a worker thread, keeping the event loop free. The vectors land in
+    the knowledge base's embedding cache, where retrieval picks them up without
+    re-encoding.
+    """
+    def __init__(self, kb: KnowledgeBase):
+        self.kb = kb
+        self._pending = []
+        self._lock = threading.Lock()
+        self._batch = None # Scheduled flush that texts submitted now will join
+
+    def submit(self, text: str):
+        with self._lock:
+            self._pending.append(text)
+
+    def flush(self) -> Dict[str, np.ndarray]:
+        """Embeds every pending text in one batch; returns text -> (d,) embedding."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return {}
+        return dict(zip(pending, self.kb.embed_batch(pending)))
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        """Returns the (n, d) embeddings of `texts`, batched with texts queued by concurrent callers."""
+        for text in texts:
+            self.submit(text)
+        if self._batch is None:
+            self._batch = asyncio.ensure_future(self._flush_next_tick())
+        # Shielded so one cancelled caller does not cancel the batch shared with others
+        vectors = await asyncio.shield(self._batch)
+        if all(t in vectors for t in texts):
+            return np.stack([vectors[t] for t in texts])
+        # Another caller flushed some of our texts first; they are cached by now
+        return await asyncio.to_thread(self.kb.embed_batch, texts)
+
+    async def _flush_next_tick(self) -> Dict[str, np.ndarray]:
+        # Let coroutines that are ready in this tick queue their texts first
+        await asyncio.sleep(0)
+        # Texts submitted from here on start the next batch
+        self._batch = None
+        return await asyncio.to_thread(self.flush)
 
 class NLP_Agent:
     def __init__(self, pdf_path: str):
+        faiss.omp_set_num_threads(FAISS_THREADS)
         self.kb = KnowledgeBase()
         self.classifier = IntentClassifier()
         self.llm = LLMInterface()
         self.action_engine = ActionEngine()
+        self.embedder = QueryEmbedder(self.kb)
+        # Answers to near-duplicate informational queries, keyed by query embedding
+        self.sem_cache = SemanticCache()
         
         # Phase 1: Ingest
         self.kb.ingest_pdf(pdf_path)
         
+        # Restore answers and query embeddings from earlier sessions on the same document
+        self.cache_store = None
+        if self.kb.fingerprint is not None:
+            self.cache_store = CacheStore(CACHE_DB_PATH, self.kb.fingerprint, SEMANTIC_CACHE_SIZE)
+            for cached_query, query_vec, response, intent, stored_at in self.cache_store.load(SEMANTIC_CACHE_SIZE):
+                self.kb.cache_embedding(cached_query, query_vec)
+                # Answers past the TTL are skipped here; their embeddings are still reused
+                self.sem_cache.add(query_vec, response, intent, stored_at=stored_at)
+        
+    def warmup(self):
+        """Pays one-off lazy costs (encoder load, index page-in, LLM connection) before the first query."""
+        query_vec = self.kb.embed_query("warmup")
+        if self.kb.vector_store is not None:
+            self.kb.vector_store.search(query_vec, 1)
+        self.llm.warmup()
+
     def process_query(self, query: str) -> str:
+        """Synchronous entry point for callers without an event loop."""
+        return asyncio.run(self.process_query_async(query))
+
+    async def process_query_async(self, query: str) -> str:
+        return "".join([delta async for _, delta in self.process_query_stream(query, stream=False)])
+
+    async def process_query_stream(self, query: str, stream: bool = True) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Yields (intent, text delta) pairs; with `stream`, LLM answers are yielded as they are generated.
+        Raises if the LLM stream fails after part of the answer was yielded; nothing is cached then.
+        """
         # 1. Intent Classification
         intent = self.classifier.classify(query)
         logging.info(f"Query Intent: {intent}")
@@ -23,17 +129,42 @@ class NLP_Agent:
         # 2. Branching
         if intent == "Action":
             # Phase 3 Logic
-            return self.action_engine.execute(query)
+            yield intent, self.action_engine.execute(query)
         
         else:
-            # Retrieve
-            semantic_chunks = self.kb.query_similarity(query, k=5)
-            structured_facts = self.kb.query_structured(query)
+            # Reuse the answer to a near-duplicate earlier query (the embedding is
+            # memoized by the knowledge base, so retrieval below does not re-encode)
+            query_vec = await self.embedder.encode([query])
+            cached = self.sem_cache.lookup(query_vec, intent)
+            if cached is not None:
+                logging.info("Semantic cache hit.")
+                yield intent, cached
+                return
+
+            # Retrieve (independent lookups, run concurrently)
+            semantic_chunks, structured_facts = await asyncio.gather(
+                self.kb.query_similarity_async(query, k=5),
+                self.kb.query_structured_async(query)
+            )
             
-            # Combine
-            context = semantic_chunks + [{"text": f"FACT: {f['fact']}", "page": f["page"]} for f in structured_facts]
+            # Combine (facts are passed as-is; the LLM interface renders them as "FACT: ...")
+            context = chain(semantic_chunks, structured_facts)
             
             # Generate
             # We strictly separate data types as per requirements, sending both to reasoning engine
-            response = self.llm.generate_answer(query, context, intent)
-            return response
+            if stream:
+                deltas = self.llm.generate_answer(query, context, intent, stream=True)
+            else:
+                deltas = iter([await asyncio.to_thread(self.llm.generate_answer, query, context, intent)])
+            parts = []
+            while True:
+                # The LLM client blocks on the network, so pull each delta off the event loop
+                delta = await asyncio.to_thread(next, deltas, None)
+                if delta is None:
+                    break
+                parts.append(delta)
+                yield intent, delta
+            response = "".join(parts)
+            self.sem_cache.add(query_vec, response, intent)
+            if self.cache_store is not None:
+                self.cache_store.save(query, query_vec, response, intent)
@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# Minimum cosine similarity for a cached answer to be reused
+SEMANTIC_CACHE_THRESHOLD = 0.92
+# Maximum number of cached answers before the least recently used is evicted
+SEMANTIC_CACHE_SIZE = 1000
+# Seconds a cached answer stays valid
+SEMANTIC_CACHE_TTL = 300
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query embedding.
+
+    A lookup returns the stored response of the nearest previous query when its
+    cosine similarity is at least `threshold`, it was classified with the same
+    intent and it has not expired. Embeddings must be L2-normalized so that the
+    inner product equals cosine similarity.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_SIZE,
+                 ttl: float = SEMANTIC_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._index = None # Created on first insert, once the embedding width is known
+        self._entries = OrderedDict() # id -> (response, intent, stored_at), oldest access first
+        self._next_id = 0
+
+    def lookup(self, query_vec: np.ndarray, intent: str) -> Optional[str]:
+        """Returns the cached response for a near-duplicate query, or None."""
+        if self._index is None or self._index.ntotal == 0:
+            return None
+        scores, ids = self._index.search(query_vec, 1)
+        entry_id = int(ids[0][0])
+        if entry_id == -1 or scores[0][0] < self.threshold:
+            return None
+
+        response, cached_intent, stored_at = self._entries[entry_id]
+        if time.time() - stored_at > self.ttl:
+            self._evict(entry_id)
+            return None
+        if cached_intent != intent:
+            return None
+        self._entries.move_to_end(entry_id)
+        return response
+
+    def add(self, query_vec: np.ndarray, response: str, intent: str, stored_at: Optional[float] = None):
+        """
+        Stores `response` under `query_vec`, evicting the least recently used entry when full.
+        `stored_at` (wall-clock seconds, default now) lets persisted answers keep their original age.
+        """
+        if stored_at is None:
+            stored_at = time.time()
+        elif time.time() - stored_at > self.ttl:
+            return
+        if self._index is None:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(query_vec.shape[1]))
+        entry_id = self._next_id
+        self._next_id += 1
+        self._index.add_with_ids(query_vec, np.array([entry_id], dtype=np.int64))
+        self._entries[entry_id] = (response, intent, stored_at)
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, entry_id: int):
+        del self._entries[entry_id]
+        self._index.remove_ids(np.array([entry_id], dtype=np.int64))
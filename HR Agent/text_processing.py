@@ -0,0 +1,21 @@
+import re
+from typing import FrozenSet, List, Tuple
+
+# Sentence boundary: whitespace after '.' or '?', skipping abbreviations such as "e.g." or "Mr."
+SENT_RE = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?)\s')
+WORD_RE = re.compile(r'\w+')
+
+
+def split_sentences(text: str) -> List[Tuple[str, FrozenSet[str]]]:
+    """
+    Splits a text chunk into sentences for offline answer extraction.
+
+    Returns:
+        list: (sentence, lowercase word set) pairs, dropping fragments of 10 characters or fewer.
+    """
+    sentences = []
+    for s in SENT_RE.split(text.replace('\n', ' ')):
+        s = s.strip()
+        if len(s) > 10: # Filter noise
+            sentences.append((s, frozenset(WORD_RE.findall(s.lower()))))
+    return sentences
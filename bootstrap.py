@@ -0,0 +1,16 @@
+import os
+import sys
+
+# Shared setup for the entry scripts (cli.py, run_hr_agent.py).
+# Named bootstrap rather than config so it does not shadow "HR Agent/config.py".
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Source document for RAG, resolved and checked once at import
+PDF_PATH = os.path.join(ROOT_DIR, "FULL-Annual-Report-2024-25.pdf")
+PDF_EXISTS = os.path.exists(PDF_PATH)
+
+# Add the HR Agent directory to sys.path to allow imports
+HR_AGENT_PATH = os.path.join(ROOT_DIR, "HR Agent")
+if HR_AGENT_PATH not in sys.path:
+    sys.path.append(HR_AGENT_PATH)
@@ -1,27 +1,52 @@
 import sys
 import os
 import time
+import asyncio
+import threading
+import io
 import json
 import re
 import logging
 
 # --- CONFIGURATION ---
-COOLDOWN_SECONDS = 3.0
+# Query rate limit (requests per minute), matched to the LLM provider's quota
+DEFAULT_RATE_LIMIT_RPM = 20
+
+def _read_rpm() -> int:
+    """Reads HR_RPM, falling back to the default when it is not a positive integer."""
+    value = os.environ.get("HR_RPM")
+    if value is None:
+        return DEFAULT_RATE_LIMIT_RPM
+    try:
+        rpm = int(value)
+    except ValueError:
+        rpm = 0
+    if rpm < 1:
+        print(f"[!] WARNING: HR_RPM={value!r} is not a positive integer, using {DEFAULT_RATE_LIMIT_RPM}.")
+        return DEFAULT_RATE_LIMIT_RPM
+    return rpm
+
+RATE_LIMIT_RPM = _read_rpm()
+
+# Response post-processing: "Intent: <Tag>" header and structural noise lines
+_INTENT_RE = re.compile(r"Intent:\s*(.+)")
+# A noise line starts (after indentation) with one of the header/footer markers
+_NOISE_MARKERS = ("=====", "----", "Intent:", "AGENT RESPONSE")
+_NOISE_LINE_RE = re.compile(r"^[ \t]*(?:%s).*\n?" % "|".join(map(re.escape, _NOISE_MARKERS)), re.MULTILINE)
+_LINE_PIECE_RE = re.compile(r"[^\n]*\n|[^\n]+")
+_JSON_DECODER = json.JSONDecoder()
 
 # SUppress lower-level logs from the agent modules
 logging.basicConfig(level=logging.ERROR)
 
-# Ensure we are running from the directory containing this script
-script_dir = os.path.dirname(os.path.abspath(__file__))
-os.chdir(script_dir)
+# Resolves the PDF path and makes the HR Agent modules importable
+from bootstrap import ROOT_DIR, PDF_PATH, PDF_EXISTS
 
-# Add the HR Agent directory to sys.path to allow imports
-hr_agent_path = os.path.join(script_dir, "HR Agent")
-if hr_agent_path not in sys.path:
-    sys.path.append(hr_agent_path)
+# Ensure we are running from the directory containing this script
+os.chdir(ROOT_DIR)
 
 try:
-    from nlp_agent import NLP_Agent
+    from nlp_agent import NLP_Agent, FAISS_THREADS
 except ImportError as e:
     print(f"CRITICAL SYSTEM ERROR: Could not import NLP_Agent.\nDetails: {e}")
     sys.exit(1)
@@ -35,7 +60,7 @@ class AgentAdapter:
     def __init__(self, agent: NLP_Agent):
         self._agent = agent
 
-    def run(self, query: str) -> dict:
+    async def run(self, query: str) -> dict:
         """
         Executes query against agent and parses the response into the contract format.
         Returns:
@@ -44,24 +69,36 @@ class AgentAdapter:
             { "intent": "Policy", "answer": str }
         """
         try:
-            raw_response = self._agent.process_query(query)
+            raw_response = await self._agent.process_query_async(query)
         except Exception as e:
             # Graceful degradation if agent fails internally
             return {"intent": "Policy", "answer": f"System Error: Agent execution failed temporarily. ({e})"}
+        return self.parse(raw_response)
+
+    async def run_stream(self, query: str):
+        """
+        Executes query against agent, yielding (intent, delta) pairs as the response is generated.
+        Callers buffer the deltas and pass the full text to `parse` at end of stream.
+        """
+        try:
+            async for intent, delta in self._agent.process_query_stream(query):
+                yield intent, delta
+        except Exception as e:
+            # Graceful degradation if agent fails internally
+            yield "Policy", f"System Error: Agent execution failed temporarily. ({e})\n"
 
+    def parse(self, raw_response: str) -> dict:
+        """Parses a complete agent response into the contract format (see `run`)."""
         # Strip whitespace for parsing
         cleaned = raw_response.strip()
 
         # 1. Detect JSON/Action Response
         # We look for a JSON-like structure starting with {
-        if "{" in cleaned and "}" in cleaned:
-             # Try to find the first '{' and last '}' to extract potential JSON
-            start = cleaned.find("{")
-            end = cleaned.rfind("}") + 1
-            potential_json = cleaned[start:end]
-            
+        start = cleaned.find("{")
+        if start != -1:
             try:
-                data = json.loads(potential_json)
+                # Parse in place from the first '{'; any trailing prose is ignored
+                data, _ = _JSON_DECODER.raw_decode(cleaned, start)
                 # Success - It is an action
                 return {"intent": "Action", "json": data}
             except json.JSONDecodeError:
@@ -72,20 +109,13 @@ class AgentAdapter:
         # The agent output often contains "Intent: ..." headers. We want just the answer.
         
         # Regex to find "Intent: <Tag>"
-        intent_match = re.search(r"Intent:\s*(.+)", cleaned)
+        intent_match = _INTENT_RE.search(cleaned)
         intent_tag = intent_match.group(1).strip() if intent_match else "Informational"
 
         # Regex to extract content after logical separators if present
         # We look for the main content blocks usually separated by lines
-        lines = cleaned.split('\n')
-        filtered_lines = []
-        for line in lines:
-            # Remove structural noise
-            if "=====" in line or "----" in line or "Intent:" in line or "AGENT RESPONSE" in line:
-                continue
-            filtered_lines.append(line)
-        
-        clean_text = "\n".join(filtered_lines).strip()
+        # Remove structural noise lines in one pass
+        clean_text = _NOISE_LINE_RE.sub("", cleaned).strip()
         
         if not clean_text:
              clean_text = raw_response # Fallback to raw if over-cleaning occurred
@@ -93,27 +123,140 @@ class AgentAdapter:
         return {"intent": "Policy", "answer": clean_text}
 
 
+class TokenBucket:
+    """
+    Async token-bucket rate limiter: bursts of up to `capacity` requests,
+    refilled continuously at `rate` tokens per second.
+    """
+    def __init__(self, capacity: int, rate: float):
+        if capacity < 1 or rate <= 0:
+            raise ValueError(f"TokenBucket needs capacity >= 1 and rate > 0, got {capacity} and {rate}")
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a token is available, then takes it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class StreamFilter:
+    """
+    Streaming counterpart of the text cleanup in `AgentAdapter.parse`: drops noise lines
+    and surrounding whitespace, passing everything else through as soon as it arrives.
+    A line is held back only while it could still turn into a noise line (its start is
+    blank or a prefix of a noise marker), and whitespace only until more text follows,
+    so the output does not depend on how the stream is split into deltas.
+    """
+    def __init__(self):
+        self._line = ""      # Held-back start of the current line
+        self._live = False   # Current line is already known to be content
+        self._started = False # Leading whitespace is dropped
+        self._space = ""     # Held-back whitespace, emitted once more text follows
+
+    def feed(self, delta: str) -> str:
+        out = []
+        for piece in _LINE_PIECE_RE.findall(delta):
+            if self._live:
+                out.append(piece)
+                self._live = not piece.endswith("\n")
+                continue
+            self._line += piece
+            if self._line.endswith("\n"):
+                if not _NOISE_LINE_RE.match(self._line):
+                    out.append(self._line)
+                self._line = ""
+            elif not self._could_be_noise(self._line):
+                out.append(self._line)
+                self._line = ""
+                self._live = True
+        return self._trim("".join(out))
+
+    def close(self) -> str:
+        """Returns the held-back tail at end of stream, unless it is noise; trailing whitespace is dropped."""
+        tail, self._line = self._line, ""
+        return "" if _NOISE_LINE_RE.match(tail) else self._trim(tail)
+
+    def _trim(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        body = text.rstrip()
+        if not body:
+            self._space += text
+            return ""
+        out = self._space + body
+        self._space = text[len(body):]
+        return out
+
+    @staticmethod
+    def _could_be_noise(partial: str) -> bool:
+        partial = partial.lstrip(" \t")
+        return any(marker.startswith(partial) or partial.startswith(marker) for marker in _NOISE_MARKERS)
+
+
 def clear_screen():
-    os.system('cls' if os.name == 'nt' else 'clear')
+    # ANSI clear + cursor home; avoids spawning a 'cls'/'clear' subprocess
+    sys.stdout.write("\x1b[2J\x1b[H")
+    sys.stdout.flush()
+
+def read_input(prompt: str) -> asyncio.Future:
+    """
+    Reads one line on a daemon thread so the event loop keeps running while the user types.
+    A daemon thread (rather than the default executor) lets the process exit on Ctrl+C
+    without waiting for the pending input() to return.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(setter, value):
+        if not future.done():
+            setter(value)
 
-def main():
+    def reader():
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(resolve, future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(resolve, future.set_result, line)
+
+    threading.Thread(target=reader, daemon=True).start()
+    return future
+
+async def main():
+    if os.name == 'nt':
+        os.system("") # Enables ANSI escape processing in the Windows console
+    
     # --- 1. INITIALIZATION ---
     print("Initialize HR Operations Agent...")
     print("Loading Knowledge Base... [Please Wait]")
     
     agent_instance = None
     try:
-        # Point to the PDF. 
-        pdf_path = os.path.abspath(os.path.join(script_dir, "FULL-Annual-Report-2024-25.pdf"))
-        
-        if not os.path.exists(pdf_path):
-             print(f"\n[!] WARNING: PDF file not found at {pdf_path}")
+        if not PDF_EXISTS:
+             print(f"\n[!] WARNING: PDF file not found at {PDF_PATH}")
              print("    Agent will run in limited mode.\n")
         
         # Initialize Agent
-        agent_instance = NLP_Agent(pdf_path)
+        agent_instance = NLP_Agent(PDF_PATH)
         adapter = AgentAdapter(agent_instance)
         
+        # Warm the encoder, index and LLM connection while the banner is shown
+        threading.Thread(target=agent_instance.warmup, daemon=True).start()
+        
     except Exception as e:
         print(f"\n[FATAL] Initialization Failed: {e}")
         return
@@ -124,18 +267,21 @@ def main():
     print("==================================================================")
     print(" GUIDELINES:")
     print("  - Type your query naturally (e.g., 'What is the leave policy?')")
-    print("  - System enforces a delay between queries for stability.")
+    print(f"  - System limits queries to {RATE_LIMIT_RPM} per minute for stability.")
+    print(f"  - Vector search uses {FAISS_THREADS} threads (set OMP_NUM_THREADS to change).")
     print("  - Type 'exit' or 'quit' to terminate session.")
     print("==================================================================")
 
     # --- 2. REPL LOOP ---
     last_query = ""
+    # Replaces a fixed per-query cooldown: follow-ups run at once until the quota is spent
+    rate_limiter = TokenBucket(capacity=RATE_LIMIT_RPM, rate=RATE_LIMIT_RPM / 60)
     
     while True:
         try:
             # A. INPUT
             print("\n[READY]")
-            user_input = input("HR-CLI >> ").strip()
+            user_input = (await read_input("HR-CLI >> ")).strip()
             
             # B. VALIDATION
             if not user_input:
@@ -152,12 +298,37 @@ def main():
             
             last_query = user_input
             
+            # Only waits once the per-minute quota is used up
+            await rate_limiter.acquire()
+            
             print("... Processing ...")
             
-            # C. EXECUTION (Synchronous)
-            result = adapter.run(user_input)
+            # C. EXECUTION (policy answers stream straight to stdout; actions are buffered)
+            buffer = io.StringIO()
+            stream_filter = StreamFilter()
+            streamed = False
+            async for intent, delta in adapter.run_stream(user_input):
+                buffer.write(delta)
+                if intent == "Action":
+                    continue
+                text = stream_filter.feed(delta)
+                if text:
+                    if not streamed:
+                        print("\n" + "="*66)
+                        print("[?] INFORMATION / POLICY")
+                        print("-" * 30)
+                        streamed = True
+                    sys.stdout.write(text)
+                    sys.stdout.flush()
             
             # D. RENDERING
+            if streamed:
+                # The filter holds back trailing whitespace, so the answer never ends in a newline
+                print(stream_filter.close())
+                print("="*66)
+                continue
+            
+            result = adapter.parse(buffer.getvalue())
             print("\n" + "="*66)
             
             if result.get("intent") == "Action":
@@ -174,17 +345,18 @@ def main():
             
             print("="*66)
             
-            # E. COOLDOWN (Mandatory)
-            time.sleep(COOLDOWN_SECONDS)
-            
         except KeyboardInterrupt:
             print("\n\n[!] Interrupt Signal Received. Exiting...")
             break
         except Exception as e:
             print(f"\n[!] UNEXPECTED ERROR: {e}")
             # Prevent loop crash, strict recover
-            time.sleep(1)
+            await asyncio.sleep(1)
             continue
 
 if __name__ == "__main__":
-    main()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        # asyncio.run cancels the REPL on Ctrl+C and re-raises here
+        print("\n\n[!] Interrupt Signal Received. Exiting...")
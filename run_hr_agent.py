@@ -1,15 +1,12 @@
 import sys
 import os
-import time
+import asyncio
 
-# Ensure we are running from the directory containing this script
-script_dir = os.path.dirname(os.path.abspath(__file__))
-os.chdir(script_dir)
+# Resolves the PDF path and makes the HR Agent modules importable
+from bootstrap import ROOT_DIR, PDF_PATH, PDF_EXISTS
 
-# Add the HR Agent directory to sys.path to allow imports
-hr_agent_path = os.path.join(script_dir, "HR Agent")
-if hr_agent_path not in sys.path:
-    sys.path.append(hr_agent_path)
+# Ensure we are running from the directory containing this script
+os.chdir(ROOT_DIR)
 
 try:
     from nlp_agent import NLP_Agent
@@ -17,36 +14,42 @@ except ImportError as e:
     print(f"Error importing NLP_Agent: {e}")
     sys.exit(1)
 
+# Upper bound on queries in flight at once; lower it if the LLM provider starts rate limiting
+MAX_CONCURRENT_QUERIES = 3
+
+async def run_tests(agent, tests):
+    """Runs every (title, query) pair concurrently and prints the results in order."""
+    gate = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+
+    async def run_one(query):
+        async with gate:
+            return await agent.process_query_async(query)
+
+    results = await asyncio.gather(*(run_one(q) for _, q in tests))
+    for (title, query), result in zip(tests, results):
+        print(f"\n--- {title} ---")
+        print(f"Q: {query}")
+        print(result)
+
 if __name__ == "__main__":
     print("Initializing Agent...")
-    # Point to the PDF. Assuming it is in the parent directory of 'agent/'
-    pdf_path = os.path.abspath(os.path.join(script_dir, "FULL-Annual-Report-2024-25.pdf"))
-    
     # Check if PDF exists to be robust
-    if not os.path.exists(pdf_path):
-        print(f"Warning: PDF file not found at {pdf_path}")
+    if not PDF_EXISTS:
+        print(f"Warning: PDF file not found at {PDF_PATH}")
         # asking user to check path? or just proceeding might fail.
         # But per instructions, I should run the tasks correctly.
     
     # Initialize Agent
-    # Note: KnowledgeBase defaults to loading 'faiss_index.bin' from CWD (which is now 'agent/')
-    agent = NLP_Agent(pdf_path)
+    # Note: KnowledgeBase loads '<fingerprint>.faiss' from CWD when the PDF was ingested before
+    # (without the PDF, the artifacts recorded in 'artifacts.latest.json' are used)
+    agent = NLP_Agent(PDF_PATH)
     
-    print("\n--- Test 1: Informational ---")
     q1 = "What is the revenue growth?"
-    print(f"Q: {q1}")
-    
-    print(agent.process_query(q1))
-    # Add delay to avoid Rate Limits
-    time.sleep(5)
-    
-    print("\n--- Test 2: Action ---")
     q2 = "Apply for earned leave next monday"
-    print(f"Q: {q2}")
-    print(agent.process_query(q2))
-    time.sleep(5)
-    
-    print("\n--- Test 3: Policy ---")
     q3 = "What is the dividend distribution policy?"
-    print(f"Q: {q3}")
-    print(agent.process_query(q3))
+    
+    asyncio.run(run_tests(agent, [
+        ("Test 1: Informational", q1),
+        ("Test 2: Action", q2),
+        ("Test 3: Policy", q3),
+    ]))